@@ -3,7 +3,73 @@ Helper functions for monitor mode
 """
 
 import os
-from yaml import safe_load, safe_dump
+import copy
+import atexit
+from json import dump
+from time import monotonic
+
+# (yaml module, loader class, dumper class), imported on first use so that
+# loading this module does not pull in PyYAML/libyaml
+_YAML = None
+
+
+def _yaml_backend():
+    """
+    Import PyYAML on first use, preferring the libyaml-backed classes.
+    """
+    global _YAML  # pylint: disable=global-statement
+    if _YAML is None:
+        import yaml  # pylint: disable=import-outside-toplevel
+        try:
+            _YAML = (yaml, yaml.CSafeLoader, yaml.CSafeDumper)
+        except AttributeError:
+            _YAML = (yaml, yaml.SafeLoader, yaml.SafeDumper)
+    return _YAML
+
+
+def safe_load(stream):
+    """
+    Parse YAML with the libyaml-backed loader when available.
+    """
+    yaml, loader, _ = _yaml_backend()
+    return yaml.load(stream, Loader=loader)
+
+
+def safe_dump(data, stream=None, **kwargs):
+    """
+    Emit YAML with the libyaml-backed dumper when available.
+    """
+    yaml, _, dumper = _yaml_backend()
+    return yaml.dump(data, stream, Dumper=dumper, **kwargs)
+
+
+# Map each protocol to its meter family:
+# IDM and NetIDM are typically electric
+# SCM and SCM+ are typically water or gas
+# R900 and R900BCD can be water or gas
+_PROTO_CLASS = {
+    'idm': 'energy',
+    'netidm': 'energy',
+    'scm': 'scm',
+    'scm+': 'scm',
+    'r900': 'r900',
+    'r900bcd': 'r900',
+}
+
+# Consumption threshold above which a water/gas meter is likely water
+# (in gallons) rather than gas (in cubic feet)
+_PROTO_THRESHOLDS = {
+    'scm': (100000, 'water', 'gas'),
+    'r900': (50000, 'water', 'gas'),
+}
+
+
+# Format and unit of measurement for each device class
+_CLASS_DEFAULTS = {
+    'water': {'format': '######.##', 'unit_of_measurement': 'gal'},
+    'gas': {'format': '######.##', 'unit_of_measurement': 'ft³'},
+    'energy': {'format': '######.###', 'unit_of_measurement': 'kWh'},
+}
 
 
 def guess_meter_type(protocol, consumption_rate=None):
@@ -17,34 +83,22 @@ def guess_meter_type(protocol, consumption_rate=None):
     Returns:
         str: 'gas', 'water', or 'energy'
     """
-    protocol = str(protocol).lower() if protocol else ''
-    
-    # SCM and SCM+ are typically water or gas
-    # IDM and NetIDM are typically electric
-    # R900 and R900BCD can be water or gas
-    
-    if protocol in ['idm', 'netidm']:
-        return 'energy'
-    elif protocol in ['scm', 'scm+']:
-        # SCM is usually water, but can be gas
-        # If consumption is very high, likely water (in gallons)
-        # If consumption is lower, likely gas (in cubic feet)
-        if consumption_rate and consumption_rate > 100000:
-            return 'water'
-        else:
-            return 'gas'
-    elif protocol in ['r900', 'r900bcd']:
-        # R900 can be either water or gas
-        # Higher consumption values typically indicate water meters
-        if consumption_rate and consumption_rate > 50000:
-            return 'water'
-        else:
-            return 'gas'
-    
-    return 'energy'  # Default to energy if unknown
+    if isinstance(protocol, str):
+        protocol = protocol.lower()
+    else:
+        protocol = str(protocol).lower() if protocol else ''
 
+    kind = _PROTO_CLASS.get(protocol)
+    if kind is None or kind == 'energy':
+        return 'energy'  # Default to energy if unknown
 
-def get_smart_defaults(meter_id, protocol, device_class):
+    threshold, high, low = _PROTO_THRESHOLDS[kind]
+    if consumption_rate and consumption_rate > threshold:
+        return high
+    return low
+
+
+def get_smart_defaults(meter_id, protocol, device_class, id_int=None):
     """
     Get smart defaults for a meter based on its type.
     
@@ -52,12 +106,13 @@ def get_smart_defaults(meter_id, protocol, device_class):
         meter_id (str): The meter ID
         protocol (str): The meter protocol
         device_class (str): The device class (gas, water, energy)
+        id_int (int): Optional meter ID already converted to an integer
     
     Returns:
         dict: Default configuration for the meter
     """
     defaults = {
-        'id': int(meter_id),
+        'id': id_int if id_int is not None else int(meter_id),
         'protocol': protocol.lower(),
         'name': f'meter_{meter_id}',
         'device_class': device_class,
@@ -65,15 +120,7 @@ def get_smart_defaults(meter_id, protocol, device_class):
     }
     
     # Add format and unit based on device class
-    if device_class == 'water':
-        defaults['format'] = '######.##'
-        defaults['unit_of_measurement'] = 'gal'
-    elif device_class == 'gas':
-        defaults['format'] = '######.##'
-        defaults['unit_of_measurement'] = 'ft³'
-    elif device_class == 'energy':
-        defaults['format'] = '######.###'
-        defaults['unit_of_measurement'] = 'kWh'
+    defaults.update(_CLASS_DEFAULTS.get(device_class, {}))
     
     return defaults
 
@@ -96,19 +143,40 @@ class MonitorModeTracker:
         self.max_meters = max_meters
         self.logger = logger
         self.discovered_meters = {}
+        # Sidecar file holding the meters discovered so far
+        root, ext = os.path.splitext(config_path)
+        if ext not in ('.yaml', '.yml'):
+            root = config_path
+        self._discovered_file = root + '_discovered.yaml'
+        # Discoveries not yet written to the sidecar file
+        self._dirty = False
+        # Discoveries not yet merged into the main config file
+        self._config_dirty = False
+        self._last_flush = monotonic()
+        # (mtime_ns, parsed config) of the last main config file read/written
+        self._cfg_cache = None
+        # IDs of the meters already present in the main config file
+        self._existing_ids = set()
+        try:
+            self._load_config()
+        except Exception as e:
+            if self.logger:
+                self.logger.warning('Failed to read meters from config file: %s', e)
         self.load_discovered_meters()
+        # Make sure pending discoveries survive an unexpected exit
+        atexit.register(self.maybe_flush, 0)
     
     def load_discovered_meters(self):
         """
         Load previously discovered meters from a separate file.
         """
-        discovered_file = self.config_path.replace('.yaml', '_discovered.yaml').replace('.yml', '_discovered.yaml')
-        if os.path.isfile(discovered_file) and os.access(discovered_file, os.R_OK):
+        if os.path.isfile(self._discovered_file) and os.access(self._discovered_file, os.R_OK):
             try:
-                with open(discovered_file, 'r', encoding='utf-8') as f:
+                with open(self._discovered_file, 'r', encoding='utf-8') as f:
                     data = safe_load(f)
                     if data and 'discovered_meters' in data:
                         self.discovered_meters = data['discovered_meters']
+                        self._config_dirty = bool(self.discovered_meters)
                         if self.logger:
                             self.logger.info('Loaded %d previously discovered meters', len(self.discovered_meters))
             except Exception as e:
@@ -124,79 +192,121 @@ class MonitorModeTracker:
             protocol (str): The meter protocol
             consumption (int): Optional consumption value
         """
+        # Meter IDs are always tracked as strings
+        meter_id = str(meter_id)
+
+        # Already seen or configured meters and a full list are the common
+        # case in a busy RF environment, so bail out before any other work
+        if meter_id in self.discovered_meters or meter_id in self._existing_ids:
+            return
+        if len(self.discovered_meters) >= self.max_meters:
+            return
 
         # Ensure protocol is a string
         protocol = str(protocol) if protocol else ''
-        
-        if meter_id not in self.discovered_meters:
-            if len(self.discovered_meters) < self.max_meters:
-                device_class = guess_meter_type(protocol, consumption)
-                self.discovered_meters[meter_id] = {
-                    'protocol': protocol.lower(),
-                    'device_class': device_class,
-                    'first_seen_consumption': consumption
-                }
-                if self.logger:
-                    self.logger.info('Discovered new meter: ID=%s, Protocol=%s, Type=%s', 
-                                     meter_id, protocol, device_class)
+        normalized_protocol = protocol.lower()
+        device_class = guess_meter_type(normalized_protocol, consumption)
+        self.discovered_meters[meter_id] = {
+            'id_int': int(meter_id),
+            'protocol': normalized_protocol,
+            'device_class': device_class,
+            'first_seen_consumption': consumption
+        }
+        self._dirty = True
+        self._config_dirty = True
+        if self.logger:
+            self.logger.info('Discovered new meter: ID=%s, Protocol=%s, Type=%s', 
+                             meter_id, protocol, device_class)
     
     def save_discovered_meters(self):
         """
         Save discovered meters to a separate file.
+        The file is written as JSON, which is also valid YAML, so it can
+        still be read back with the YAML loader.
         """
-        discovered_file = self.config_path.replace('.yaml', '_discovered.yaml').replace('.yml', '_discovered.yaml')
         try:
             data = {'discovered_meters': self.discovered_meters}
-            with open(discovered_file, 'w', encoding='utf-8') as f:
-                safe_dump(data, f, default_flow_style=False, allow_unicode=True)
+            # Write to a temporary file and swap it in, so a crash never
+            # leaves a truncated sidecar behind
+            tmp_file = self._discovered_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                dump(data, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self._discovered_file)
+            self._dirty = False
+            self._last_flush = monotonic()
             if self.logger:
-                self.logger.info('Saved %d discovered meters to %s', len(self.discovered_meters), discovered_file)
+                self.logger.info('Saved %d discovered meters to %s', len(self.discovered_meters), self._discovered_file)
         except Exception as e:
             if self.logger:
                 self.logger.error('Failed to save discovered meters: %s', e)
     
+    def _load_config(self):
+        """
+        Return a copy of the main config file, parsing it again only when
+        it changed on disk since it was last read or written.
+        """
+        st = os.stat(self.config_path)
+        if self._cfg_cache and st.st_mtime_ns == self._cfg_cache[0]:
+            return copy.deepcopy(self._cfg_cache[1])
+
+        with open(self.config_path, 'r', encoding='utf-8') as f:
+            config = safe_load(f)
+        if config is None:
+            config = {}
+        if not config.get('meters'):
+            config['meters'] = []
+        self._existing_ids = {str(m['id']) for m in config['meters']}
+        self._cfg_cache = (st.st_mtime_ns, copy.deepcopy(config))
+        return config
+
+    def maybe_flush(self, min_interval=5.0):
+        """
+        Save discovered meters if there are unsaved changes and the last
+        save happened more than min_interval seconds ago.
+
+        Args:
+            min_interval (float): Minimum number of seconds between saves
+        """
+        if self._dirty and monotonic() - self._last_flush > min_interval:
+            self.save_discovered_meters()
+
     def update_config_with_discovered_meters(self):
         """
         Update the main config file with discovered meters.
         This should be called on shutdown or periodically.
         """
-        if not self.discovered_meters:
+        if not self.discovered_meters or not self._config_dirty:
             return
         
         try:
-            # Read the current config
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = safe_load(f)
-            
-            if config is None:
-                config = {}
-            
-            # Get existing meter IDs
-            existing_ids = set()
-            if 'meters' in config and config['meters']:
-                existing_ids = {str(m['id']) for m in config['meters']}
-            else:
-                config['meters'] = []
+            config = self._load_config()
             
             # Add discovered meters that aren't already in config
-            added_count = 0
+            added_ids = []
             for meter_id, meter_info in self.discovered_meters.items():
-                if meter_id not in existing_ids and added_count < self.max_meters:
+                if meter_id not in self._existing_ids and len(added_ids) < self.max_meters:
                     defaults = get_smart_defaults(
                         meter_id, 
                         meter_info['protocol'], 
-                        meter_info['device_class']
+                        meter_info['device_class'],
+                        meter_info.get('id_int')
                     )
                     config['meters'].append(defaults)
-                    added_count += 1
+                    added_ids.append(meter_id)
             
-            if added_count > 0:
+            if added_ids:
                 # Write the updated config back
                 with open(self.config_path, 'w', encoding='utf-8') as f:
                     safe_dump(config, f, default_flow_style=False, allow_unicode=True)
+                self._cfg_cache = (os.stat(self.config_path).st_mtime_ns, config)
+                self._existing_ids.update(added_ids)
                 
                 if self.logger:
-                    self.logger.info('Added %d discovered meters to config file', added_count)
+                    self.logger.info('Added %d discovered meters to config file', len(added_ids))
+
+            self._config_dirty = False
         
         except Exception as e:
             if self.logger:
@@ -443,6 +443,7 @@ def main():
                             protocol,
                             reading['consumption']
                         )
+                        monitor_tracker.maybe_flush()
                 else:
                     # Normal mode: publish to MQTT
                     # Add the meter_id to the read_counter